@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 import sys
 import re
+import math
+
+from analysis import ControlFlowAnalysis
+from exec_trace import TraceWriter
+from paged_memory import PagedMemory
+from timing import TimingModel
 
 class CPU:
     """
@@ -170,17 +176,36 @@ class Simulator:
 
     def __init__(self, memory_size=1048576): # 1MB por padrão
         self.cpu = CPU()
-        self.memory = bytearray(memory_size) # Memória byte-addressable
+        self.memory = PagedMemory(memory_size) # Memória byte-addressable (páginas de 4 KiB sob demanda)
         self.program = {}
         self.labels = {}  # Dicionário para guardar rótulos (Labels)
         self.output_log = ""
         self.trace_hardware = False
         self.constants = {}  # Para apoiar diretivas CONST
+        self.data_labels = {}  # Rótulos de dados (DB/DW) -> offset em DS
+        self._data_image = []  # Blocos (offset em DS, bytes) gravados na memória a cada carga
+        self._asm_cache = None  # Último fonte montado (remontagem incremental)
+        self.headless = False  # Sem log textual (execuções longas / rastro binário)
+        self._trace = None  # TraceWriter ativo durante run(trace_path=...)
+        self._last_write = None  # Última escrita em memória (para o rastro)
+        self.timing = None  # TimingModel opcional (ciclos do 8086)
+        self.cache = None  # DataCache opcional no caminho de memória (desligado por padrão)
+        self._exec_ip = None  # IP da instrução em execução (estatísticas do cache)
+        self.bus = None  # DeviceBus opcional para IN/OUT (ver devices.py)
+        self.instruction_count = 0  # Relógio em instruções desde a carga do programa
+        self.stop_reason = None  # Motivo da última parada de run(): END, LIMIT, ERROR, NO_PROGRESS
+        self.stop_address = None  # IP da instrução onde a execução parou (ERROR/NO_PROGRESS)
+        self._mem_hash = None  # Impressão digital incremental da memória (detecção de laços)
+        self._loop_state = None  # Estado do algoritmo de Brent (ver _start_loop_detection)
+        self._analysis = None  # ControlFlowAnalysis do programa carregado (alvos pré-resolvidos)
 
         # Pilha começa no topo da memória
         self.cpu.set_reg('sp', 0xFFFE)
         self.cpu.set_reg('bp', 0xFFFE)
 
+        # Pulos que não alteram estado algum além do IP (pulo para si mesmo = travado)
+        self.jump_opcodes = {'JMP', 'JE', 'JNE', 'JG', 'JGE', 'JL', 'JLE'}
+
         self.valid_opcodes = {
             'MOV', 'ADD', 'SUB', 'INC', 'DEC', 'MUL', 'DIV', 'NEG',
             'AND', 'OR', 'XOR', 'NOT', 'CMP',
@@ -234,6 +259,9 @@ class Simulator:
             self.log_hardware("BUS", f"Endereço [0x{address:05X}] -> Barramento de Endereços")
             self.log_hardware("BUS", f"Sinal de Controle: MEMR (Ler Memória)")
 
+        if self.cache is not None:
+            self.cache.access(address % memlen, 1 if bits == 8 else 2, False, self._exec_ip)
+
         if bits == 8:
             return self.memory[address % memlen]
 
@@ -257,6 +285,15 @@ class Simulator:
             self.log_hardware("BUS", f"Dado [0x{value:04X}] ou {value} -> Barramento de Dados")
             self.log_hardware("BUS", f"Sinal de Controle: MEMW (Escrever Memória)")
 
+        if self.cache is not None:
+            self.cache.access(address % memlen, 1 if bits == 8 else 2, True, self._exec_ip)
+
+        if self._mem_hash is not None:
+            self._hash_memory_write(address % memlen, value, bits)
+
+        if self._trace is not None:
+            self._last_write = (address % memlen, value & (0xFF if bits == 8 else 0xFFFF), bits)
+
         if bits == 8:
             self.memory[address % memlen] = value & 0xFF
             return
@@ -266,7 +303,33 @@ class Simulator:
         self.memory[address % memlen] = val_low
         self.memory[(address + 1) % memlen] = val_high
     
-    def _jump_target(self, operand):
+    def _hash_memory_write(self, address, value, bits):
+        """
+        Atualiza a impressão digital da memória (estilo Zobrist): cada byte
+        contribui com hash((endereço, valor)), trocado por XOR a cada escrita.
+        """
+        memlen = len(self.memory)
+        h = self._mem_hash
+        for i in range(1 if bits == 8 else 2):
+            a = (address + i) % memlen
+            new = (value >> (8 * i)) & 0xFF
+            h ^= hash((a, self.memory[a])) ^ hash((a, new))
+        self._mem_hash = h
+
+    def analyze(self):
+        """
+        Análise estática do programa carregado (grafo de fluxo, alvos dos desvios,
+        rótulos indefinidos, código inalcançável e laços). Calculada uma vez por carga.
+        """
+        if self._analysis is None or self._analysis.program is not self.program:
+            self._analysis = ControlFlowAnalysis(self.program, self.labels,
+                                                 self.cpu.get_reg('cs'), len(self.memory))
+        return self._analysis
+
+    def _jump_target(self, operand, target=None):
+        # Alvo já resolvido na análise estática?
+        if target is not None:
+            return target
         op = operand.lower().strip()
         # 1. É um label?
         if op in self.labels:
@@ -430,20 +493,235 @@ class Simulator:
 
 
     def log_print(self, message):
+        if self.headless:
+            return
         self.output_log += str(message)
 
+    # Diretiva CONST: ex "CONST BUF = 0x100"
+    _CONST_RE = re.compile(r'^(CONST|const)\s+([A-Za-z_]\w*)\s*=\s*(.+)$')
+    # Diretivas de dados: ex "tabela DW 1, 2, 10 DUP(0)", "msg DB 'oi', 0", "ORG 100h"
+    _DATA_RE = re.compile(r'^(?:([A-Za-z_]\w*)\s+)?(DB|DW)\s+(.+)$', re.IGNORECASE)
+    _ORG_RE = re.compile(r'^ORG\s+(.+)$', re.IGNORECASE)
+    _DUP_RE = re.compile(r'^(.+?)\s+DUP\s*\((.*)\)$', re.IGNORECASE)
+    _SYMBOL_RE = re.compile(r'\b[A-Za-z_]\w*\b')
+
+    def _is_directive(self, raw):
+        """Linha com CONST/DB/DW/ORG (mudam símbolos ou dados de todo o programa)"""
+        line = raw.split(';')[0].strip()
+        return bool(self._CONST_RE.match(line) or self._DATA_RE.match(line) or self._ORG_RE.match(line))
+
+    def _resolve_symbols(self, operand):
+        """
+        Substitui CONST e rótulos de dados pelo seu valor numérico, seja no
+        operando inteiro (`MOV SI, tabela` -> offset) ou dentro de colchetes
+        (`MOV AX, [tabela+bx]` -> conteúdo), no estilo NASM.
+        """
+        key = operand.lower()
+        if key in self.constants:
+            return str(self.constants[key])
+        if key in self.data_labels:
+            return str(self.data_labels[key])
+        if operand.startswith('[') and (self.constants or self.data_labels):
+            def lookup(m):
+                name = m.group(0).lower()
+                if name in self.constants:
+                    return str(self.constants[name])
+                return str(self.data_labels.get(name, m.group(0)))
+            return self._SYMBOL_RE.sub(lookup, operand)
+        return operand
+
+    def _data_number(self, text):
+        """Valor numérico de um item de dado: imediato (0x.., 10h, decimal), CONST ou rótulo de dado"""
+        item = text.strip().lower()
+        if item == '?':
+            return 0
+        if item in self.constants:
+            return self.constants[item]
+        if item in self.data_labels:
+            return self.data_labels[item]
+        if item.endswith('h') and item[:-1] and all(c in "0123456789abcdef" for c in item[:-1]):
+            return int(item[:-1], 16)
+        try:
+            return int(item, 0)
+        except ValueError:
+            raise ValueError(f"Valor de dado inválido: '{text.strip()}'") from None
+
+    def _split_data_items(self, text):
+        """Separa itens por vírgula, respeitando aspas e parênteses do DUP"""
+        items, current, depth, quote = [], '', 0, None
+        for c in text:
+            if quote:
+                current += c
+                if c == quote:
+                    quote = None
+                continue
+            if c in ('"', "'"):
+                quote = c
+            elif c == '(':
+                depth += 1
+            elif c == ')':
+                depth -= 1
+            elif c == ',' and depth == 0:
+                items.append(current.strip())
+                current = ''
+                continue
+            current += c
+        if quote or depth:
+            raise ValueError(f"Lista de dados mal formada: '{text}'")
+        items.append(current.strip())
+        return items
+
+    def _parse_data_values(self, text, limit=0x10000):
+        """
+        Lista de valores de uma diretiva DB/DW (strings, DUP aninhado, '?').
+        Nunca monta mais de `limit` valores: um DUP grande demais é recusado
+        antes da expansão.
+        """
+        values = []
+        for item in self._split_data_items(text):
+            if len(item) >= 2 and item[0] in ('"', "'") and item[-1] == item[0]:
+                values.extend(ord(c) for c in item[1:-1])
+            else:
+                m = self._DUP_RE.match(item)
+                if m:
+                    count = self._data_number(m.group(1))
+                    if not 0 <= count <= 0x10000:
+                        raise ValueError(f"Quantidade inválida em DUP: {count}")
+                    inner = self._parse_data_values(m.group(2), limit) if count else []
+                    if count * len(inner) > limit - len(values):
+                        raise ValueError("Dados ultrapassam o limite do segmento (64 KB)")
+                    values.extend(inner * count)
+                else:
+                    values.append(self._data_number(item))
+            if len(values) > limit:
+                raise ValueError("Dados ultrapassam o limite do segmento (64 KB)")
+        return values
+
+    def _build_data_image(self, lines):
+        """
+        Processa as diretivas DB/DW/ORG em ordem, registrando os rótulos de dados
+        (offsets em DS) e montando blocos contíguos (offset, bytearray).
+        """
+        self.data_labels = {}
+        chunks = []
+        offset = 0
+        for line in lines:
+            m = self._ORG_RE.match(line)
+            if m:
+                offset = self._data_number(m.group(1))
+                if not 0 <= offset <= 0xFFFF:
+                    raise ValueError(f"ORG fora do segmento (0 a 0FFFFh): '{m.group(1).strip()}'")
+                continue
+
+            m = self._DATA_RE.match(line)
+            name, kind, body = m.group(1), m.group(2).upper(), m.group(3)
+            if name:
+                name = name.lower()
+                if name in self.constants or name in self.data_labels:
+                    raise ValueError(f"Símbolo '{name}' definido mais de uma vez")
+                if name.upper() in self.valid_opcodes or self._is_register_name(name):
+                    raise ValueError(f"Nome de dado inválido: '{name}'")
+                self.data_labels[name] = offset
+
+            values = self._parse_data_values(body)
+            if kind == 'DB':
+                data = bytearray(v & 0xFF for v in values)
+            else:
+                data = bytearray()
+                for v in values:
+                    data += (v & 0xFFFF).to_bytes(2, 'little')
+
+            if offset + len(data) > 0x10000:
+                raise ValueError(f"Dados em '{line}' ultrapassam o limite do segmento (64 KB)")
+            if chunks and chunks[-1][0] + len(chunks[-1][1]) == offset:
+                chunks[-1][1].extend(data)
+            elif data:
+                chunks.append((offset, data))
+            offset += len(data)
+        return chunks
+
+    def _is_register_name(self, name):
+        try:
+            self.cpu.get_reg(name)
+            return True
+        except ValueError:
+            return False
+
+    def _apply_data_image(self):
+        """Grava os dados iniciais em DS: uma atribuição de fatia por bloco contíguo"""
+        memlen = len(self.memory)
+        base = self.cpu.get_reg('ds') << 4
+        for offset, data in self._data_image:
+            start = (base + offset) % memlen
+            end = start + len(data)
+            if end <= memlen:
+                self.memory[start:end] = data
+            else:
+                # Wrap-around no fim da memória
+                split = memlen - start
+                self.memory[start:] = data[:split]
+                self.memory[:end - memlen] = data[split:]
+
+    def _code_address(self, offset):
+        """Endereço físico CS:offset sem passar pelo log da MMU (usado na montagem)"""
+        physical_addr = (self.cpu.get_reg('cs') << 4) + (offset & 0xFFFF)
+        if physical_addr >= len(self.memory):
+            physical_addr %= len(self.memory)
+        return physical_addr
+
+    def _parse_source_line(self, raw):
+        """
+        Interpreta uma única linha do código-fonte. Retorna:
+         - None para linhas em branco/comentários
+         - ('CONST', nome, valor)
+         - ('LABEL', nome)
+         - ('INSTR', opcode, operandos, tamanho), com as CONST já substituídas
+        """
+        line = raw.split(';')[0].strip()
+        if not line:
+            return None
+
+        m = self._CONST_RE.match(line)
+        if m:
+            return ('CONST', m.group(2).lower(), int(m.group(3).strip(), 0))
+
+        if self._DATA_RE.match(line) or self._ORG_RE.match(line):
+            # Já processada em _build_data_image; não ocupa espaço no código
+            return ('DATA',)
+
+        if line.endswith(':'):
+            name = line[:-1].strip().lower()
+            # O nome seria trocado pelo valor do símbolo nos operandos (ex: JMP fim -> JMP 256)
+            if name in self.constants or name in self.data_labels:
+                raise ValueError(f"Rótulo '{name}' já definido como CONST ou dado")
+            return ('LABEL', name)
+
+        parts = line.split(maxsplit=1)
+        opcode = parts[0].upper()
+        if opcode not in self.valid_opcodes:
+            raise ValueError(f"Comando desconhecido '{opcode}'")
+
+        operands = []
+        if len(parts) > 1:
+            operands = [x.strip() for x in parts[1].split(',')]
+            operands = [self._resolve_symbols(op) for op in operands]
+        return ('INSTR', opcode, operands, self._get_instruction_size(operands))
+
     def load_program_from_text(self, assembly_code_text, initial_segments=None):
         """
         Carrega o programa. Faz uma "pré-compilação" em duas passagens
         para encontrar e registrar todos os rótulos (labels).
         Agora suporta:
          - Diretivas simples: CONST NAME = value
+         - Dados: [nome] DB/DW valores (strings, N DUP(...), '?') e ORG offset,
+           gravados em DS na carga; o nome vira o offset do dado em DS
          - Ignora comentários em linhas com ';'
          - Ignora linhas em branco
          - Trata labels com espaços ao redor
+         - Remontagem incremental: só as linhas alteradas desde a última carga
+           são reinterpretadas; as seguintes apenas têm offsets deslocados
         """
         self.cpu.reset()
-        self.constants = {}
 
         if initial_segments:
             # Itera sobre o dicionário: {'cs': 0, 'ds': 10...}
@@ -457,91 +735,305 @@ class Simulator:
         self.cpu.set_reg('ip', 0)
         cs = self.cpu.get_reg('cs')
 
+        # Contagem de ciclos e dispositivos recomeçam a cada programa carregado
+        if self.timing is not None:
+            self.timing = TimingModel()
+        self.instruction_count = 0
+        self.stop_reason = None
+        self.stop_address = None
+        self._analysis = None
+        if self.bus is not None:
+            self.bus.reset()
+
         raw_lines = assembly_code_text.split('\n')
-        lines = []
-        # Pré-processamento: remove comentários e espaços; captura diretivas CONST
+
+        try:
+            if not self._assemble_incremental(raw_lines, cs):
+                self._assemble_full(raw_lines, cs)
+            self._apply_data_image()
+        except Exception:
+            self._asm_cache = None
+            self.labels = {}
+            self.program = {}
+            raise
+
+    def _assemble_full(self, raw_lines, cs):
+        """Montagem completa: coleta CONST e dados e interpreta todas as linhas"""
+        self.constants = {}
+        data_lines = []
         for raw in raw_lines:
             line = raw.split(';')[0].strip()
-            if not line:
-                continue
-            # Diretiva CONST: ex "CONST BUF = 0x100"
-            m = re.match(r'^(CONST|const)\s+([A-Za-z_]\w*)\s*=\s*(.+)$', line)
+            m = self._CONST_RE.match(line)
             if m:
-                name = m.group(2).lower()
-                val = int(m.group(3).strip(), 0)
-                self.constants[name] = val
-                continue
-            lines.append(line)
+                self.constants[m.group(2).lower()] = int(m.group(3).strip(), 0)
+            elif self._DATA_RE.match(line) or self._ORG_RE.match(line):
+                data_lines.append(line)
+        self._data_image = self._build_data_image(data_lines)
 
         self.labels = {}
         self.program = {}
+        self._asm_cache = {
+            'cs': cs,
+            'memlen': len(self.memory),
+            'lines': [],
+            'entries': [],
+            'offsets': [0],  # offset no início de cada linha (+ offset final)
+            'label_counts': {},
+            'program': self.program,
+            'labels': self.labels,
+        }
+        self._splice_source(raw_lines, 0, 0)
 
-        # Passagem 1: Mapear Labels (calculando offsets)
-        temp_offset = 0
-        for line_num, line in enumerate(lines, 1):
-            if line.endswith(':'):
-                self.labels[line[:-1].strip().lower()] = temp_offset
-            else:
-                parts = line.split(maxsplit=1)
-                opcode = parts[0].upper()
-                if opcode not in self.valid_opcodes:
-                    raise ValueError(f"Linha {line_num}: Comando desconhecido '{opcode}'")
-                
-                ops = []
-                if len(parts) > 1:
-                    ops = [x.strip() for x in parts[1].split(',')]
-                    ops = [str(self.constants.get(o.lower(), o)) for o in ops]
-                temp_offset += self._get_instruction_size(ops)
+    def _assemble_incremental(self, raw_lines, cs):
+        """
+        Compara o novo fonte com o último carregado (prefixo/sufixo comuns)
+        e remonta só o trecho alterado. Retorna False quando a montagem
+        completa é necessária (primeira carga, CS diferente, CONST alterada,
+        rótulos duplicados ou programa/labels modificados por fora).
+        """
+        cache = self._asm_cache
+        if (cache is None or cache['cs'] != cs or cache['memlen'] != len(self.memory)
+                or cache['program'] is not self.program or cache['labels'] is not self.labels):
+            return False
+
+        old_lines = cache['lines']
+        n_old, n_new = len(old_lines), len(raw_lines)
+        limit = min(n_old, n_new)
+
+        prefix = 0
+        while prefix < limit and old_lines[prefix] == raw_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < limit - prefix
+               and old_lines[n_old - 1 - suffix] == raw_lines[n_new - 1 - suffix]):
+            suffix += 1
+
+        old_entries = cache['entries'][prefix:n_old - suffix]
+        new_raw = raw_lines[prefix:n_new - suffix]
+
+        # CONST ou dados alterados mudam a substituição de símbolos em todo o programa
+        if any(e is not None and e[0] in ('CONST', 'DATA') for e in old_entries):
+            return False
+        if any(self._is_directive(raw) for raw in new_raw):
+            return False
+
+        # Rótulos repetidos dependem da ordem de definição: remonta tudo
+        counts = cache['label_counts']
+        for e in old_entries:
+            if e is not None and e[0] == 'LABEL' and counts.get(e[1], 0) > 1:
+                return False
+        for raw in new_raw:
+            line = raw.split(';')[0].strip()
+            if line.endswith(':') and line[:-1].strip().lower() in counts:
+                if not any(e is not None and e[0] == 'LABEL' and e[1] == line[:-1].strip().lower()
+                           for e in old_entries):
+                    return False
 
+        self._splice_source(raw_lines, prefix, suffix)
+        return True
 
-        # Passagem 2: Carregar Mapa (IP -> instrução)
-        current_offset = 0
-        for line in lines:
-            if line.endswith(':'): continue
-            parts = line.split(maxsplit=1)
-            opcode = parts[0].upper()
-            operands = []
-            if len(parts) > 1:
-                operands = [x.strip() for x in parts[1].split(',')]
-                operands = [str(self.constants.get(op.lower(), op)) for op in operands]
-            size = self._get_instruction_size(operands)
-            address = self.get_physical_address('cs', current_offset)
-            self.program[address] = (opcode, operands, size)
-            current_offset += size
-
-    def run(self):
-        """Executa o programa carregado"""
+    def _splice_source(self, raw_lines, prefix, suffix):
+        """
+        Substitui as linhas [prefix, n_old - suffix) do fonte em cache pelas
+        novas linhas correspondentes, atualizando program, labels e offsets.
+        Instruções anteriores ao trecho são mantidas; as posteriores só são
+        deslocadas se o tamanho do trecho mudou.
+        """
+        cache = self._asm_cache
+        lines, entries, offsets = cache['lines'], cache['entries'], cache['offsets']
+        counts = cache['label_counts']
+        n_old, n_new = len(lines), len(raw_lines)
+        old_end, new_end = n_old - suffix, n_new - suffix
+
+        # 1. Interpreta somente as linhas novas (pode lançar erro sem alterar o estado)
+        new_entries = []
+        for i, raw in enumerate(raw_lines[prefix:new_end]):
+            try:
+                new_entries.append(self._parse_source_line(raw))
+            except ValueError as e:
+                # Numeração igual à original: conta só linhas de código/rótulos
+                line_num = 1 + sum(1 for x in entries[:prefix] + new_entries
+                                   if x is not None and x[0] in ('INSTR', 'LABEL'))
+                raise ValueError(f"Linha {line_num}: {e}") from None
+
+        start = offsets[prefix]
+        new_offsets = []
+        current = start
+        for e in new_entries:
+            new_offsets.append(current)
+            if e is not None and e[0] == 'INSTR':
+                current += e[3]
+        delta = current - offsets[old_end]
+
+        # 2. Remove o trecho antigo (e o sufixo, se ele for deslocado)
+        remove_end = n_old if delta else old_end
+        for i in range(prefix, remove_end):
+            e = entries[i]
+            if e is None:
+                continue
+            if e[0] == 'INSTR':
+                self.program.pop(self._code_address(offsets[i]), None)
+            elif e[0] == 'LABEL' and i < old_end:
+                counts[e[1]] -= 1
+                if counts[e[1]] == 0:
+                    del counts[e[1]]
+                    self.labels.pop(e[1], None)
+
+        lines[prefix:old_end] = raw_lines[prefix:new_end]
+        entries[prefix:old_end] = new_entries
+        offsets[prefix:old_end] = new_offsets
+
+        # 3. Insere o trecho novo e reposiciona o sufixo
+        shift_end = len(entries) if delta else new_end
+        for i in range(prefix, shift_end):
+            if i >= new_end:
+                offsets[i] += delta
+            e = entries[i]
+            if e is None:
+                continue
+            if e[0] == 'INSTR':
+                self.program[self._code_address(offsets[i])] = (e[1], e[2], e[3])
+            elif e[0] == 'LABEL':
+                if i < new_end:
+                    counts[e[1]] = counts.get(e[1], 0) + 1
+                self.labels[e[1]] = offsets[i]
+        offsets[-1] += delta
+
+    def run(self, max_instructions=10000, trace_path=None, headless=False, timing=False,
+            detect_loops=True):
+        """
+        Executa o programa carregado.
+         - trace_path: grava um registro binário por instrução (ver exec_trace)
+         - headless: não monta o log textual; só erros fatais vão para output_log
+         - timing: contabiliza os ciclos do 8086 desta execução em self.timing (ver timing.py)
+         - detect_loops: para com stop_reason 'NO_PROGRESS' ao detectar um laço
+           sem progresso (pulo para si mesmo ou estado repetido num desvio para trás)
+        O motivo da parada fica em self.stop_reason / self.stop_address.
+        """
         self.cpu.set_reg('ip', 0)
 
-        max_instructions = 10000
         count = 0
-        self.trace_hardware = True
+        self.stop_reason = None
+        self.stop_address = None
 
-        while count < max_instructions:
-            ip = self.cpu.get_reg('ip')
-            cs = self.cpu.get_reg('cs')
-            address = self.get_physical_address('cs', ip)
+        if detect_loops:
+            self._start_loop_detection()
+        # Cada execução tem sua própria contagem; timing=False desliga o modelo
+        self.timing = TimingModel() if timing else None
+        if self.cache is not None:
+            self.cache.reset()
+        self.headless = headless
+        self.trace_hardware = not headless
+        registers = self.cpu._registers
+        bus = self.bus
+
+        if trace_path is not None:
+            self._trace = TraceWriter(trace_path)
 
-            if address not in self.program:
-                break
+        targets = self.analyze().targets
 
-            opcode, operands, size = self.program[address]
+        try:
+            while count < max_instructions:
+                ip = self.cpu.get_reg('ip')
+                cs = self.cpu.get_reg('cs')
+                address = self.get_physical_address('cs', ip)
 
-            # Avança IP para próxima instrução (comportamento previsto)
-            self.cpu.set_reg('ip', ip + size)
-            self.cpu.dump()
+                if address not in self.program:
+                    break
 
-            try:
-                self.log_print(f"[IP={ip:04X}] Executando: {opcode} {', '.join(operands)}\n")
-                self.execute_instruction(opcode, operands)
-            except Exception as e:
-                self.log_print(f"Erro Fatal: {e}")
-                break
+                opcode, operands, size = self.program[address]
+
+                if self.cache is not None:
+                    self._exec_ip = ip
+
+                # Só o próximo evento agendado é consultado
+                if bus is not None and self.instruction_count >= bus.next_due:
+                    bus.dispatch(self.instruction_count)
+
+                if self._trace is not None:
+                    regs_before = dict(registers)
+                    self._last_write = None
 
-            count += 1
+                # Avança IP para próxima instrução (comportamento previsto)
+                self.cpu.set_reg('ip', ip + size)
+                self.cpu.dump()
 
-    def execute_instruction(self, opcode, operands):
-        """Decodificador e executor de instruções (COMPLETO com correções)"""
+                try:
+                    self.log_print(f"[IP={ip:04X}] Executando: {opcode} {', '.join(operands)}\n")
+                    self.execute_instruction(opcode, operands, targets.get(address))
+                except Exception as e:
+                    self.output_log += f"Erro Fatal: {e}"
+                    self.stop_reason, self.stop_address = 'ERROR', ip
+                    break
+
+                self.instruction_count += 1
+
+                if self.timing is not None:
+                    next_ip = (ip + size) & 0xFFFF
+                    self.timing.charge(ip, opcode, operands, taken=registers['ip'] != next_ip)
+
+                if self._trace is not None:
+                    self._trace.record(ip, registers['ip'], opcode, regs_before, registers,
+                                       self.cpu.flags, self._last_write)
+
+                count += 1
+
+                # Só desvios para trás são amostrados (o teste barato fica aqui no laço)
+                if detect_loops and registers['ip'] <= ip and self._no_progress(ip, opcode):
+                    self._stop_no_progress(ip)
+                    break
+
+            if self.stop_reason is None:
+                self.stop_reason = 'LIMIT' if count >= max_instructions else 'END'
+        finally:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+            self._mem_hash = None
+            self.headless = False
+
+    def _start_loop_detection(self):
+        """
+        Detecção de ciclo de Brent sobre as amostras nos desvios para trás:
+        memória O(1), acha qualquer ciclo em até ~2x o seu comprimento
+        """
+        self._mem_hash = 0
+        self._loop_state = [None, 1, 1]  # impressão digital salva, potência, passos
+
+    def _no_progress(self, ip, opcode):
+        """
+        Chamado após um desvio para trás da instrução em `ip`. Eventos agendados
+        no barramento podem mudar o estado, então nesse caso não há como afirmar
+        travamento. O estado dos dispositivos (fila de entrada, console...) entra
+        na impressão digital.
+        """
+        registers = self.cpu._registers
+        bus = self.bus
+        if bus is not None and bus.next_due != math.inf:
+            return False
+        if registers['ip'] == ip and opcode in self.jump_opcodes:
+            return True
+
+        fingerprint = (tuple(registers.values()), tuple(self.cpu.flags.values()), self._mem_hash,
+                       bus.state_token() if bus is not None else None)
+        state = self._loop_state
+        stuck = fingerprint == state[0]
+        if state[2] == state[1]:
+            state[0] = fingerprint
+            state[1] *= 2
+            state[2] = 0
+        state[2] += 1
+        return stuck
+
+    def _stop_no_progress(self, ip):
+        self.stop_reason, self.stop_address = 'NO_PROGRESS', ip
+        self.output_log += f"Execução interrompida: sem progresso (laço infinito) em IP={ip:04X}\n"
+
+    def execute_instruction(self, opcode, operands, target=None):
+        """
+        Decodificador e executor de instruções (COMPLETO com correções).
+        target: alvo de JMP/Jcc/CALL/LOOP já resolvido pela análise estática (opcional)
+        """
 
         # --- Grupo de Movimentação ---
         if opcode == 'MOV':
@@ -678,20 +1170,22 @@ class Simulator:
             self.cpu.set_flags_full(val1, val2, result, op='sub', bits=bits)
 
         elif opcode == 'JMP':
-            target = operands[0]
- 
-            if target.lower() in self.labels:
-                addr = self.labels[target.lower()]
+            label = operands[0]
+
+            if target is not None:
+                addr = target
+            elif label.lower() in self.labels:
+                addr = self.labels[label.lower()]
             else:
                 
                 try:
-                    addr = self._get_operand_value(target)
+                    addr = self._get_operand_value(label)
                 except ValueError:
-                    self.log_print(f"Erro: Rótulo '{target}' não encontrado.\n")
+                    self.log_print(f"Erro: Rótulo '{label}' não encontrado.\n")
                     return
 
             self.cpu.set_reg('ip', addr)
-            self.log_print(f"JMP para {target} -> IP={addr:04X}")
+            self.log_print(f"JMP para {label} -> IP={addr:04X}")
 
         # Jumps Condicionais
         elif opcode in ('JE', 'JNE', 'JG', 'JGE', 'JL', 'JLE'):
@@ -709,7 +1203,7 @@ class Simulator:
             elif opcode == 'JLE': condition_met = (ZF == 1 or SF != OF)
 
             if condition_met:
-                addr = self._jump_target(operands[0])
+                addr = self._jump_target(operands[0], target)
                 self.cpu.set_reg('ip', addr)
                 self.log_print(f"{opcode}: Pulando para {operands[0]} -> IP={addr:04X}")
             else:
@@ -724,7 +1218,7 @@ class Simulator:
             self._write_memory(sp, ip, 16, segment='ss')
             self.log_print(f"CALL: Salvando IP={ip:04X} na pilha [{sp:04X}] | ")
             # JMP para o label
-            addr = self._jump_target(operands[0])
+            addr = self._jump_target(operands[0], target)
             self.cpu.set_reg('ip', addr)
             self.log_print(f"CALL: Salvou IP={ip:04X}, pulando para {operands[0]} -> IP={addr:04X}")
 
@@ -746,7 +1240,7 @@ class Simulator:
             cx = (self.cpu.get_reg('cx') - 1) & 0xFFFF
             self.cpu.set_reg('cx', cx)
             if cx != 0: 
-                addr = self._jump_target(operands[0])
+                addr = self._jump_target(operands[0], target)
                 self.cpu.set_reg('ip', addr)
                 self.log_print(f"LOOP: CX={cx}, pulando para {operands[0]} -> IP={addr:04X}")
             else:
@@ -755,31 +1249,54 @@ class Simulator:
         # --- I/O ---
         elif opcode == 'IN':
             dest, port = operands[0], operands[1]
-            # Simulação: retorna 0 para evitar bloqueio
-            val = 0
+            bits = 8 if self._is_reg_8bit(dest) else 16
+            if self.bus is not None:
+                self.bus.now = self.instruction_count
+                val = self.bus.read(self._get_operand_value(port), bits)
+            else:
+                # Sem barramento: retorna 0 para evitar bloqueio
+                val = 0
             self.log_print(f"[IN] Lendo porta {port} -> {val}\n")
-            self._set_operand_value(dest, val)
+            self._set_operand_value(dest, val, bits)
 
         elif opcode == 'OUT':
             port, src = operands[0], operands[1]
-            val = self._get_operand_value(src)
+            bits = 8 if self._is_reg_8bit(src) else 16
+            val = self._get_operand_value(src, bits)
+            if self.bus is not None:
+                self.bus.now = self.instruction_count
+                if not self.bus.write(self._get_operand_value(port), val, bits):
+                    self.log_print(f"Aviso (OUT): nenhum dispositivo na porta {port}. ")
             self.log_print(f"Simulador (OUT): Porta {port} recebeu valor {val}")
 
         else:
             raise NotImplementedError(f"Instrução '{opcode}' desconhecida ou não implementada.")
 
-    def step(self):
-        self.trace_hardware = True
+    def step(self, verbose=True):
+        """
+        Executa uma instrução. Com verbose=False o log detalhado (FETCH/EXECUTE e
+        trace de hardware) vira uma linha por instrução, como em run().
+        """
+        self.trace_hardware = verbose
         ip = self.cpu.get_reg('ip')
+        start_ip = ip
         cs = self.cpu.get_reg('cs')
         address = self.get_physical_address('cs', ip)
 
         if address not in self.program: self.log_print("FIM DO PROGRAMA"); return "END"
+
+        if self.bus is not None and self.instruction_count >= self.bus.next_due:
+            self.bus.dispatch(self.instruction_count)
         
         opcode, operands, _ = self.program[address]
+        target = self.analyze().targets.get(address)
+        self._exec_ip = ip
         
+        if not verbose:
+            self.log_print(f"[IP={ip:04X}] Executando: {opcode} {', '.join(operands)}\n")
+
         # 1. Busca Instrução (Opcode)
-        self.log_print(f"\n=== FETCH ===\n")
+        if verbose: self.log_print(f"\n=== FETCH ===\n")
         self.log_hardware("CPU", f"Endereço Físico {address:05X} -> Barramento de Endereços")
         self.log_hardware("BUS", f"<- Barramento de Dados (Instrução: {opcode})")
         
@@ -789,36 +1306,136 @@ class Simulator:
             self.cpu.set_reg('ip', ip)
             self.log_hardware("CPU", f"IP Avançado +2 para {ip:04X}")
   
-            self.log_print(f"--- BUSCA OPERANDS ---\n")
+            if verbose: self.log_print(f"--- BUSCA OPERANDS ---\n")
             address = self.get_physical_address('cs', ip)
                 
             self.log_hardware("CPU", f"Endereço Físico {address:05X} -> Barramento de Endereços")
             self.log_hardware("BUS", f"<- Barramento de Dados (Operando: {op})")
 
-        self.log_print(f"\n=== EXECUTE ===\n")
-        self.log_print(f"\nExecutando: {opcode} {', '.join(operands)}\n==============================\n")
+        if verbose:
+            self.log_print(f"\n=== EXECUTE ===\n")
+            self.log_print(f"\nExecutando: {opcode} {', '.join(operands)}\n==============================\n")
         ip = (ip + 2) & 0xFFFF
         self.cpu.set_reg('ip', ip)
         try:
-            self.execute_instruction(opcode, operands)
+            self.execute_instruction(opcode, operands, target)
         except Exception as e:
             self.log_print(f"Erro: {e}\n")
             return "END"
+        self.instruction_count += 1
+
+        if self.timing is not None:
+            self.timing.charge(start_ip, opcode, operands, taken=self.cpu.get_reg('ip') != ip)
         return "OK"
 
-    def reset(self):
+    def step_many(self, count, snapshot_every=0, coalesce_logs=False, max_instructions=10000,
+                  detect_loops=True):
+        """
+        Executa até `count` passos no servidor (para antes se o programa acabar).
+         - snapshot_every: guarda um snapshot do estado a cada K instruções (0 = nenhum),
+           com as linhas de log geradas desde o snapshot anterior
+         - coalesce_logs: uma linha de log por instrução em vez do FETCH/EXECUTE completo
+         - max_instructions: limite de passos por chamada, como em run() (count é truncado)
+         - detect_loops: para com status 'NO_PROGRESS' num laço sem progresso, como em run()
+        O estado final vem em "state"; "logs" traz só as linhas posteriores ao último
+        snapshot (sem snapshots, o log inteiro, como em get_state_json()).
+        """
+        if count < 0:
+            raise ValueError(f"Número de passos inválido: {count}")
+        if snapshot_every < 0:
+            raise ValueError(f"Intervalo de snapshots inválido: {snapshot_every}")
+        count = min(count, max_instructions)
+
+        snapshots = []
+        executed = 0
+        status = "OK"
+        # O log de cada passo vai para uma lista: concatenar tudo em output_log
+        # a cada instrução custaria tempo quadrático no tamanho do log
+        chunks = [self.output_log]
+        log_mark = 1
+        if detect_loops:
+            self._start_loop_detection()
+
+        try:
+            while executed < count:
+                self.output_log = ''
+                ip = self.cpu.get_reg('ip')
+                entry = self.program.get(self._code_address(ip))
+
+                status = self.step(verbose=not coalesce_logs)
+                if status != "OK":
+                    chunks.append(self.output_log)
+                    break
+                executed += 1
+                if detect_loops and self.cpu.get_reg('ip') <= ip and self._no_progress(ip, entry[0]):
+                    self._stop_no_progress(ip)
+                    status = "NO_PROGRESS"
+                chunks.append(self.output_log)
+                if status != "OK":
+                    break
+                if snapshot_every and executed % snapshot_every == 0:
+                    new_log = ''.join(chunks[log_mark:])
+                    log_mark = len(chunks)
+                    snapshots.append({
+                        "step": executed,
+                        "state": self._state_snapshot(),
+                        "logs": new_log.split('\n') if new_log else [],
+                    })
+        finally:
+            self.output_log = ''.join(chunks)
+            self._mem_hash = None
+
+        result = self.get_state_json()
+        if snapshots:
+            # As linhas anteriores já foram enviadas nos snapshots
+            new_log = ''.join(chunks[log_mark:])
+            result["logs"] = new_log.split('\n') if new_log else []
+        result["steps"] = executed
+        result["status"] = status
+        result["snapshots"] = snapshots
+        return result
 
+    def reset(self):
+        """
+        Volta ao estado de um Simulator recém-criado, reaproveitando a instância:
+        a memória zera só as páginas escritas desde o último reset. Barramento,
+        cache e modelo de ciclos continuam ligados, mas reiniciados.
+        """
         self.cpu.reset()
         self.cpu.set_reg("ip", 0)
+        self.memory.clear()
 
         self.halted = False
         self.labels = {}
         self.program = {}
+        self.constants = {}
+        self._asm_cache = None
+        self._analysis = None
+        self.data_labels = {}
+        self._data_image = []
         self.output_log = ""
+        self.trace_hardware = False
+        self.headless = False
+        self.instruction_count = 0
+        self.stop_reason = None
+        self.stop_address = None
+        self._exec_ip = None
+        self._last_write = None
+        if self.timing is not None:
+            self.timing = TimingModel()
+        if self.cache is not None:
+            self.cache.reset()
+        if self.bus is not None:
+            self.bus.reset()
 
         return "RESET_OK"
 
-    def get_state_json(self):
+    def memory_bytes(self):
+        """Bytes de memória da máquina simulada efetivamente alocados"""
+        return self.memory.allocated_bytes()
+
+    def _state_snapshot(self):
+        """Registradores, flags e os 256 bytes a partir de DS (cópias independentes)"""
 
         dump = self.cpu.dump()
 
@@ -834,10 +1451,25 @@ class Simulator:
             mem_view += [0] * (256 - len(mem_view))
 
         return {
-            "state": {
-                "registers": dump['registers'],
-                "flags": dump['flags'],
-                "memory": mem_view
-            },
+            "registers": dump['registers'],
+            "flags": dict(dump['flags']),
+            "memory": mem_view
+        }
+
+    def get_state_json(self):
+
+        result = {
+            "state": self._state_snapshot(),
             "logs": self.output_log.split('\n') if self.output_log else []
         }
+
+        if self.timing is not None:
+            result["timing"] = self.timing.report(self.labels)
+        if self.cache is not None:
+            result["cache"] = self.cache.report()
+        if self.bus is not None:
+            result["devices"] = self.bus.report()
+        if self.stop_reason is not None:
+            result["stop"] = {"reason": self.stop_reason, "address": self.stop_address}
+
+        return result
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Análise estática de fluxo de controle sobre Simulator.program.
+
+Constrói o grafo de fluxo (blocos básicos), resolve os alvos estáticos de
+JMP/Jcc/CALL/LOOP para offsets inteiros, aponta rótulos indefinidos e código
+inalcançável e identifica laços (arestas para trás) com estimativa do número
+de iterações quando o padrão é reconhecível.
+"""
+
+CONDITIONAL_JUMPS = ('JE', 'JNE', 'JG', 'JGE', 'JL', 'JLE')
+BRANCH_OPCODES = ('JMP', 'CALL', 'LOOP') + CONDITIONAL_JUMPS
+RETURN_OPCODES = ('RET', 'IRET')
+REGISTERS = (
+    'ax', 'bx', 'cx', 'dx', 'si', 'di', 'bp', 'sp', 'ip', 'cs', 'ds', 'ss', 'es',
+    'al', 'ah', 'bl', 'bh', 'cl', 'ch', 'dl', 'dh',
+)
+
+
+def _parse_immediate(op):
+    """Mesma precedência de Simulator._get_operand_value para imediatos (None se não for)"""
+    if op.endswith('h') and '+' not in op:
+        hexpart = op[:-1]
+        if hexpart != '' and all(c in "0123456789abcdef" for c in hexpart):
+            return int(hexpart, 16)
+    if op in REGISTERS:
+        return None
+    try:
+        return int(op, 0)
+    except ValueError:
+        return None
+
+
+class ControlFlowAnalysis:
+    """
+    Resultado da análise de um programa carregado. `targets` mapeia o endereço
+    físico de cada desvio com alvo estático para o offset de destino (usado pelo executor).
+    """
+
+    def __init__(self, program, labels, cs=0, memlen=1048576):
+        self.program = program
+        self.labels = labels
+        base = cs << 4
+
+        # offset (IP) -> (endereço físico, opcode, operandos, tamanho)
+        self.instructions = {}
+        for address, (opcode, operands, size) in program.items():
+            self.instructions[(address - base) % memlen] = (address, opcode, operands, size)
+        self.offsets = sorted(self.instructions)
+
+        self.targets = {}
+        self.static_targets = {}  # offset -> offset de destino
+        self.undefined_labels = []
+        self._undefined = set()  # offsets dos desvios com rótulo indefinido
+        self.indirect_jumps = []
+
+        self._resolve_targets()
+        self.successors = {off: self._successors(off) for off in self.offsets}
+        self.reachable = self._reachable()
+        self.blocks = self._basic_blocks()
+        self.loops = self._loops()
+
+    def _describe(self, offset):
+        _, opcode, operands, _ = self.instructions[offset]
+        return f"{opcode} {', '.join(operands)}".strip()
+
+    def _resolve_targets(self):
+        for off in self.offsets:
+            address, opcode, operands, _ = self.instructions[off]
+            if opcode not in BRANCH_OPCODES or not operands:
+                continue
+
+            op = operands[0].lower().strip()
+            if op in self.labels:
+                target = self.labels[op]
+            else:
+                target = _parse_immediate(op)
+                if target is None and (op.startswith('[') or op in REGISTERS):
+                    # Alvo em registrador/memória: só é conhecido na execução
+                    self.indirect_jumps.append({"ip": off, "instruction": self._describe(off)})
+                    continue
+                if target is None:
+                    self._undefined.add(off)
+                    self.undefined_labels.append({
+                        "ip": off, "instruction": self._describe(off), "label": operands[0],
+                    })
+                    continue
+
+            self.targets[address] = target
+            self.static_targets[off] = target
+
+    def _successors(self, off):
+        _, opcode, _, size = self.instructions[off]
+        following = off + size
+        nexts = [following] if following in self.instructions else []
+        target = self.static_targets.get(off)
+        targets = [target] if target in self.instructions else []
+
+        if opcode in RETURN_OPCODES:
+            return []
+        if opcode == 'JMP':
+            if off in self.static_targets:
+                return targets
+            # JMP para rótulo indefinido não desvia (só registra o erro)
+            return nexts if off in self._undefined else []
+        if opcode in BRANCH_OPCODES:
+            return targets + [n for n in nexts if n not in targets]
+        return nexts
+
+    def _reachable(self):
+        roots = [0] if 0 in self.instructions else []
+        if self.indirect_jumps:
+            # Desvio indireto pode cair em qualquer rótulo
+            roots += [off for off in self.labels.values() if off in self.instructions]
+        # Retornos continuam após o CALL correspondente
+        roots_after_call = {}
+        for off in self.offsets:
+            _, opcode, _, size = self.instructions[off]
+            if opcode == 'CALL' and off + size in self.instructions:
+                roots_after_call[off] = off + size
+
+        seen = set()
+        stack = list(roots)
+        while stack:
+            off = stack.pop()
+            if off in seen:
+                continue
+            seen.add(off)
+            stack.extend(self.successors[off])
+            if off in roots_after_call:
+                stack.append(roots_after_call[off])
+        return seen
+
+    def _basic_blocks(self):
+        leaders = set(self.offsets[:1])
+        leaders.update(t for t in self.static_targets.values() if t in self.instructions)
+        leaders.update(off for off in self.labels.values() if off in self.instructions)
+        for off in self.offsets:
+            _, opcode, _, size = self.instructions[off]
+            if opcode in BRANCH_OPCODES or opcode in RETURN_OPCODES:
+                if off + size in self.instructions:
+                    leaders.add(off + size)
+
+        blocks = []
+        current = None
+        for off in self.offsets:
+            if off in leaders or current is None:
+                current = {"start": off, "end": off, "instructions": []}
+                blocks.append(current)
+            current["end"] = off
+            current["instructions"].append(self._describe(off))
+        for block in blocks:
+            block["successors"] = sorted(set(self.successors[block["end"]]))
+            block["reachable"] = block["start"] in self.reachable
+        return blocks
+
+    def _label_at(self, offset):
+        for name, off in self.labels.items():
+            if off == offset:
+                return name
+        return None
+
+    def _loops(self):
+        loops = []
+        for off in self.offsets:
+            target = self.static_targets.get(off)
+            _, opcode, _, _ = self.instructions[off]
+            if target is None or target > off or opcode == 'CALL':
+                continue
+            loops.append({
+                "header": target,
+                "latch": off,
+                "label": self._label_at(target),
+                "instruction": self._describe(off),
+                "trip_count": self._trip_count(target, off, opcode),
+            })
+        return loops
+
+    def _initial_value(self, header, reg):
+        """Valor imediato de `MOV reg, imm` mais próximo antes do cabeçalho do laço"""
+        for off in reversed([o for o in self.offsets if o < header]):
+            _, opcode, operands, _ = self.instructions[off]
+            if len(operands) == 2 and operands[0].lower() == reg:
+                if opcode == 'MOV':
+                    return _parse_immediate(operands[1].lower())
+                return None
+            if len(operands) == 1 and operands[0].lower() == reg:
+                return None
+            if self.successors[off] != [off + self.instructions[off][3]]:
+                # Desvio entre a inicialização e o laço: valor incerto
+                return None
+        return None
+
+    def _trip_count(self, header, latch, opcode):
+        """
+        Iterações estimadas. Reconhece:
+         - LOOP com `MOV CX, n` antes do laço
+         - Jcc com `CMP reg, limite` e INC/DEC/ADD/SUB de reg no corpo
+        """
+        if opcode == 'LOOP':
+            init = self._initial_value(header, 'cx')
+            if init is None:
+                return None
+            return init & 0xFFFF or 0x10000
+
+        if opcode not in CONDITIONAL_JUMPS:
+            return None
+
+        body = [o for o in self.offsets if header <= o <= latch]
+        compare = None
+        for off in reversed(body):
+            _, op, operands, _ = self.instructions[off]
+            if op == 'CMP' and len(operands) == 2:
+                limit = _parse_immediate(operands[1].lower())
+                if limit is not None:
+                    compare = (operands[0].lower(), limit)
+                break
+        if compare is None:
+            return None
+
+        reg, limit = compare
+        step = 0
+        for off in body:
+            _, op, operands, _ = self.instructions[off]
+            if not operands or operands[0].lower() != reg:
+                continue
+            if op == 'INC':
+                step += 1
+            elif op == 'DEC':
+                step -= 1
+            elif op in ('ADD', 'SUB') and len(operands) == 2:
+                amount = _parse_immediate(operands[1].lower())
+                if amount is None:
+                    return None
+                step += amount if op == 'ADD' else -amount
+            elif op != 'CMP':
+                return None
+
+        init = self._initial_value(header, reg)
+        if init is None or step == 0 or (limit - init) * step < 0:
+            return None
+        return max(1, -(-abs(limit - init) // abs(step)))
+
+    def report(self):
+        """Resumo serializável para o endpoint /analyze"""
+        unreachable = [
+            {"ip": off, "instruction": self._describe(off)}
+            for off in self.offsets if off not in self.reachable
+        ]
+        return {
+            "instructions": len(self.offsets),
+            "blocks": self.blocks,
+            "jump_targets": {str(off): target for off, target in sorted(self.static_targets.items())},
+            "undefined_labels": self.undefined_labels,
+            "indirect_jumps": self.indirect_jumps,
+            "unreachable": unreachable,
+            "loops": self.loops,
+        }
@@ -1,11 +1,44 @@
-from flask import Flask, request, jsonify
+import time
+
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from Simulador import Simulator
+from cache import DataCache
+from devices import build_bus
+from pool import SimulatorPool
+import metrics
 
 app = Flask(__name__)
 CORS(app)
 
-vm = Simulator()
+# Instâncias aquecidas: /reset troca o simulador atual por uma delas
+pool = SimulatorPool(size=2, factory=lambda: metrics.track_simulator(Simulator()))
+vm = pool.acquire()
+
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    start = g.get("start_time")
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "other"
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start,
+                                        route=route, status=response.status_code)
+    return response
+
+
+def execute_and_record(route, action):
+    """Executa run/step medindo duração, instruções executadas e tamanho do log"""
+    before = vm.instruction_count
+    start = time.perf_counter()
+    action()
+    metrics.RUN_DURATION.set(time.perf_counter() - start, route=route)
+    metrics.INSTRUCTIONS_EXECUTED.inc(max(0, vm.instruction_count - before))
+    metrics.LOG_SIZE.set(len(vm.output_log), route=route)
 
 @app.route("/load", methods=["POST"])
 def load_program():
@@ -18,6 +51,10 @@ def load_program():
         if not code.strip():
             return jsonify({"error": "Nenhum código recebido"}), 400
 
+        # "devices": [{"type": "console", "port": 1}, ...] configura o barramento de E/S
+        if "devices" in data:
+            vm.bus = build_bus(data["devices"]) if data["devices"] else None
+
         vm.load_program_from_text(code, initial_segments=segments)
 
         vm.output_log = "programa carregado"
@@ -25,6 +62,7 @@ def load_program():
         return jsonify(vm.get_state_json())
 
     except Exception as e:
+        metrics.LOAD_FAILURES.inc(reason=type(e).__name__)
 
         return jsonify({
             "status": "error",
@@ -37,8 +75,12 @@ def load_program():
 def run_program():
     
     try:
+        data = request.get_json(silent=True) or {}
+        # "cache": {size, line_size, associativity, policy, write_policy} liga o cache; null desliga
+        if "cache" in data:
+            vm.cache = DataCache(**data["cache"]) if data["cache"] else None
         vm.output_log = ''
-        vm.run()
+        execute_and_record("/run", lambda: vm.run(timing=bool(data.get("timing", False))))
 
         return jsonify(vm.get_state_json())
 
@@ -54,8 +96,22 @@ def run_program():
 def step():
    
     try:
+        data = request.get_json(silent=True) or {}
         vm.output_log = ''
-        vm.step()
+
+        # {"count": N, "snapshot_every": K, "coalesce_logs": true} executa N passos (até 10000) numa só requisição
+        if "count" in data:
+            result = {}
+
+            def action():
+                result.update(vm.step_many(int(data["count"]),
+                                           int(data.get("snapshot_every", 0)),
+                                           bool(data.get("coalesce_logs", False))))
+
+            execute_and_record("/step", action)
+            return jsonify(result)
+
+        execute_and_record("/step", vm.step)
         
         return jsonify(vm.get_state_json())
     
@@ -67,11 +123,26 @@ def step():
             }), 500
 
 
+@app.route("/analyze", methods=["POST"])
+def analyze_program():
+
+    try:
+        return jsonify(vm.analyze().report())
+
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Erro ao analisar. Detalhe: {str(e)}",
+            "detail": type(e).__name__,
+            }), 500
+
+
 @app.route("/reset", methods=["POST"])
 def reset_program():
 
     global vm
-    vm = Simulator() 
+    pool.release(vm)
+    vm = pool.acquire()
 
     return jsonify(vm.get_state_json())
 
@@ -90,6 +161,12 @@ def dump_program():
             }), 500
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(debug=True,port=5000)
     
\ No newline at end of file
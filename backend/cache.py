@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo de cache de dados entre a CPU e Simulator.memory.
+
+O cache não guarda dados (a memória continua sendo a fonte da verdade):
+ele só acompanha quais linhas estariam presentes para contar acertos,
+faltas, despejos e write-backs. Fica desligado por padrão (Simulator.cache = None).
+"""
+import random
+
+POLICIES = ('LRU', 'FIFO', 'RANDOM')
+WRITE_POLICIES = ('write-back', 'write-through')
+
+
+def _is_power_of_two(n):
+    return n > 0 and (n & (n - 1)) == 0
+
+
+class DataCache:
+    """
+    Cache associativo por conjunto configurável.
+     - size: capacidade total em bytes
+     - line_size: bytes por linha
+     - associativity: vias por conjunto (size // line_size = totalmente associativo)
+     - policy: 'LRU', 'FIFO' ou 'RANDOM'
+     - write_policy: 'write-back' (com alocação na escrita) ou
+       'write-through' (sem alocação na escrita)
+    """
+
+    def __init__(self, size=1024, line_size=16, associativity=2, policy='LRU',
+                 write_policy='write-back', seed=0):
+        policy = policy.upper()
+        write_policy = write_policy.lower()
+        if policy not in POLICIES:
+            raise ValueError(f"Política de substituição '{policy}' inválida (use {', '.join(POLICIES)})")
+        if write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Política de escrita '{write_policy}' inválida (use {', '.join(WRITE_POLICIES)})")
+        if not (_is_power_of_two(size) and _is_power_of_two(line_size) and _is_power_of_two(associativity)):
+            raise ValueError("Tamanho, linha e associatividade do cache devem ser potências de 2")
+        if size < line_size * associativity:
+            raise ValueError("Cache menor que um conjunto (linha * associatividade)")
+
+        self.size = size
+        self.line_size = line_size
+        self.associativity = associativity
+        self.policy = policy
+        self.write_back = write_policy == 'write-back'
+        self.num_sets = size // (line_size * associativity)
+
+        self._line_shift = line_size.bit_length() - 1
+        self._set_mask = self.num_sets - 1
+        self._rng = random.Random(seed)
+        self._seed = seed
+        self.reset()
+
+    def reset(self):
+        """Invalida todas as linhas e zera as estatísticas"""
+        # Cada conjunto: dict tag -> dirty, em ordem de inserção (LRU/FIFO)
+        self._sets = [dict() for _ in range(self.num_sets)]
+        self._rng.seed(self._seed)
+        self.reads = 0
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+        self.memory_writes = 0  # escritas que chegam à memória (write-through)
+        self._per_ip = {}  # ip -> [acertos, faltas, despejos]
+
+    def access(self, address, nbytes, is_write, ip=None):
+        """Registra um acesso de `nbytes` a partir do endereço físico `address`"""
+        if is_write:
+            self.writes += 1
+            if not self.write_back:
+                self.memory_writes += 1
+        else:
+            self.reads += 1
+
+        first = address >> self._line_shift
+        last = (address + nbytes - 1) >> self._line_shift
+        for line in range(first, last + 1):
+            self._access_line(line, is_write, ip)
+
+    def _access_line(self, line, is_write, ip):
+        ways = self._sets[line & self._set_mask]
+        tag = line  # o número da linha serve de tag dentro do conjunto
+
+        stats = None
+        if ip is not None:
+            stats = self._per_ip.get(ip)
+            if stats is None:
+                stats = self._per_ip[ip] = [0, 0, 0]
+
+        if tag in ways:
+            self.hits += 1
+            if stats is not None:
+                stats[0] += 1
+            dirty = ways[tag] or (is_write and self.write_back)
+            if self.policy == 'LRU':
+                del ways[tag]
+            ways[tag] = dirty
+            return
+
+        self.misses += 1
+        if stats is not None:
+            stats[1] += 1
+
+        # Write-through não aloca linha na escrita
+        if is_write and not self.write_back:
+            return
+
+        if len(ways) >= self.associativity:
+            if self.policy == 'RANDOM':
+                victim = self._rng.choice(list(ways))
+            else:
+                victim = next(iter(ways))
+            if ways.pop(victim):
+                self.writebacks += 1
+            self.evictions += 1
+            if stats is not None:
+                stats[2] += 1
+
+        ways[tag] = is_write and self.write_back
+
+    def report(self):
+        """Estatísticas da execução e por endereço de instrução"""
+        accesses = self.hits + self.misses
+        return {
+            "config": {
+                "size": self.size,
+                "line_size": self.line_size,
+                "associativity": self.associativity,
+                "policy": self.policy,
+                "write_policy": 'write-back' if self.write_back else 'write-through',
+            },
+            "reads": self.reads,
+            "writes": self.writes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / accesses) if accesses else 0.0,
+            "evictions": self.evictions,
+            "writebacks": self.writebacks,
+            "memory_writes": self.memory_writes,
+            "per_instruction": [
+                {"ip": ip, "hits": h, "misses": m, "evictions": ev}
+                for ip, (h, m, ev) in sorted(self._per_ip.items())
+            ],
+        }
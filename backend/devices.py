@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Barramento de dispositivos de E/S para as instruções IN/OUT.
+
+Cada porta é mapeada para um objeto Device registrado no DeviceBus. Eventos
+dependentes de tempo (ticks do timer, entrada atrasada) ficam numa fila de
+prioridade (heap) ordenada pela contagem de instruções executadas: o laço
+de execução só compara a contagem atual com `bus.next_due`, sem consultar
+cada dispositivo a cada instrução.
+"""
+import heapq
+import itertools
+import math
+
+
+class Device:
+    """Base dos dispositivos. `ports` lista as portas atendidas pelo dispositivo."""
+
+    name = 'device'
+
+    def __init__(self, ports):
+        self.ports = tuple(ports)
+        self.bus = None
+
+    def attach(self, bus):
+        self.bus = bus
+        self.reset()
+
+    def reset(self):
+        """Volta ao estado inicial (chamado ao registrar e a cada programa carregado)"""
+
+    def read(self, port, bits):
+        return 0
+
+    def write(self, port, value, bits):
+        pass
+
+    def state_token(self):
+        """Resumo hashable do estado visível ao programa (usado na detecção de laço sem progresso)"""
+        return ()
+
+    def report(self):
+        return {"type": self.name, "ports": list(self.ports)}
+
+
+class ConsoleDevice(Device):
+    """Console de saída: cada OUT na porta grava um caractere (byte baixo)."""
+
+    name = 'console'
+
+    def __init__(self, port=0x01):
+        super().__init__([port])
+
+    def reset(self):
+        self.output = []
+
+    def write(self, port, value, bits):
+        self.output.append(chr(value & 0xFF))
+
+    def state_token(self):
+        return (len(self.output),)
+
+    def report(self):
+        info = super().report()
+        info["output"] = ''.join(self.output)
+        return info
+
+
+class TimerDevice(Device):
+    """
+    Timer programável contado em instruções executadas.
+     - OUT base, N: programa um tick a cada N instruções (0 desliga)
+     - IN base:     lê o intervalo programado
+     - IN base+1:   lê e zera o número de ticks pendentes (status)
+    """
+
+    name = 'timer'
+
+    def __init__(self, port=0x40):
+        super().__init__([port, port + 1])
+        self.base = port
+
+    def reset(self):
+        self.interval = 0
+        self.pending = 0
+        self.ticks = 0
+        self._generation = 0  # invalida ticks já agendados ao reprogramar
+
+    def write(self, port, value, bits):
+        if port != self.base:
+            return
+        self.interval = value & 0xFFFF
+        self._generation += 1
+        if self.interval:
+            self._schedule(self.bus.now + self.interval, self._generation)
+
+    def read(self, port, bits):
+        if port == self.base:
+            return self.interval
+        pending, self.pending = self.pending, 0
+        return pending
+
+    def state_token(self):
+        return (self.interval, self.pending, self.ticks)
+
+    def _schedule(self, at, generation):
+        self.bus.schedule(at, lambda now: self._tick(now, generation))
+
+    def _tick(self, now, generation):
+        if generation != self._generation:
+            return
+        self.ticks += 1
+        self.pending += 1
+        self._schedule(now + self.interval, generation)
+
+    def report(self):
+        info = super().report()
+        info.update({"interval": self.interval, "ticks": self.ticks, "pending": self.pending})
+        return info
+
+
+class InputQueueDevice(Device):
+    """
+    Fila de entrada roteirizada: `script` é uma lista de (instrução, valor);
+    cada valor fica disponível quando a contagem de instruções chega ao ponto indicado.
+     - IN base:   retira o próximo valor da fila (0 se vazia)
+     - IN base+1: quantidade de valores disponíveis
+    """
+
+    name = 'input'
+
+    def __init__(self, port=0x60, script=()):
+        super().__init__([port, port + 1])
+        self.base = port
+        self.script = [(int(at), int(value)) for at, value in script]
+
+    def reset(self):
+        self.queue = []
+        self.consumed = 0
+        for at, value in self.script:
+            self.bus.schedule(at, lambda now, value=value: self.queue.append(value))
+
+    def read(self, port, bits):
+        if port != self.base:
+            return len(self.queue)
+        if not self.queue:
+            return 0
+        self.consumed += 1
+        return self.queue.pop(0)
+
+    def state_token(self):
+        return (len(self.queue), self.consumed)
+
+    def report(self):
+        info = super().report()
+        info.update({"available": list(self.queue), "consumed": self.consumed})
+        return info
+
+
+class DeviceBus:
+    """Mapeia portas para dispositivos e agenda eventos por contagem de instruções"""
+
+    def __init__(self):
+        self.ports = {}
+        self.devices = []
+        self.now = 0
+        self.next_due = math.inf
+        self._events = []
+        self._seq = itertools.count()  # desempate estável entre eventos do mesmo instante
+
+    def register(self, device):
+        for port in device.ports:
+            if port in self.ports:
+                raise ValueError(f"Porta {port:#04x} já está em uso por '{self.ports[port].name}'")
+        for port in device.ports:
+            self.ports[port] = device
+        self.devices.append(device)
+        device.attach(self)
+        return device
+
+    def reset(self):
+        """Descarta eventos pendentes e reinicia todos os dispositivos"""
+        self.now = 0
+        self._events = []
+        self.next_due = math.inf
+        for device in self.devices:
+            device.reset()
+
+    def schedule(self, at, callback):
+        """Agenda `callback(now)` para quando a contagem de instruções chegar a `at`"""
+        heapq.heappush(self._events, (at, next(self._seq), callback))
+        self.next_due = self._events[0][0]
+
+    def dispatch(self, now):
+        """Executa os eventos vencidos até `now` (chamado só quando now >= next_due)"""
+        self.now = now
+        events = self._events
+        while events and events[0][0] <= now:
+            _, _, callback = heapq.heappop(events)
+            callback(now)
+        self.next_due = events[0][0] if events else math.inf
+
+    def read(self, port, bits=16):
+        device = self.ports.get(port)
+        if device is None:
+            return 0
+        mask = 0xFF if bits == 8 else 0xFFFF
+        return device.read(port, bits) & mask
+
+    def write(self, port, value, bits=16):
+        device = self.ports.get(port)
+        if device is not None:
+            device.write(port, value, bits)
+        return device is not None
+
+    def state_token(self):
+        """Estado de todos os dispositivos, para compor a impressão digital do Simulator"""
+        return tuple(device.state_token() for device in self.devices)
+
+    def report(self):
+        return [device.report() for device in self.devices]
+
+
+DEVICE_TYPES = {
+    'console': ConsoleDevice,
+    'timer': TimerDevice,
+    'input': InputQueueDevice,
+}
+
+
+def build_bus(config):
+    """
+    Monta um DeviceBus a partir da configuração da API, ex:
+    [{"type": "console", "port": 1}, {"type": "input", "port": 96, "script": [[10, 65]]}]
+    """
+    bus = DeviceBus()
+    for entry in config:
+        entry = dict(entry)
+        kind = entry.pop("type", None)
+        if kind not in DEVICE_TYPES:
+            raise ValueError(f"Dispositivo '{kind}' desconhecido (use {', '.join(DEVICE_TYPES)})")
+        bus.register(DEVICE_TYPES[kind](**entry))
+    return bus
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Rastro binário de execução (uma entrada de tamanho fixo por instrução).
+
+Formato do arquivo:
+  cabeçalho (16 bytes): magic b'X86T', versão (u16), tamanho do registro (u16), reservado
+  registros (24 bytes cada, little-endian):
+    ip, próximo ip              u16, u16
+    id do opcode                u8   (índice em OPCODES)
+    flags                       u8   (bit0 ZF, bit1 SF, bit2 OF, bit3 CF)
+    máscara de registradores    u16  (bit i -> REGISTERS[i] mudou)
+    valores alterados           3 x u16 (na ordem dos bits da máscara)
+    largura da escrita          u8   (0 = sem escrita, 8 ou 16 bits)
+    endereço físico da escrita  u32
+    valor escrito               u16
+    reservado                   3 bytes
+"""
+import mmap
+import struct
+from collections import namedtuple
+
+MAGIC = b'X86T'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHH8x')
+RECORD = struct.Struct('<HHBBHHHHBIH3x')
+
+# Tabela fixa de opcodes: o id gravado no arquivo é o índice nesta tupla
+OPCODES = (
+    'MOV', 'ADD', 'SUB', 'INC', 'DEC', 'MUL', 'DIV', 'NEG',
+    'AND', 'OR', 'XOR', 'NOT', 'CMP',
+    'JMP', 'JE', 'JNE', 'JG', 'JGE', 'JL', 'JLE',
+    'PUSH', 'POP', 'CALL', 'RET', 'IRET', 'LOOP',
+    'IN', 'OUT', 'XCHG',
+)
+OPCODE_IDS = {name: i for i, name in enumerate(OPCODES)}
+
+# Registradores rastreados (IP vai em campo próprio)
+REGISTERS = ('ax', 'bx', 'cx', 'dx', 'si', 'di', 'bp', 'sp', 'cs', 'ds', 'ss', 'es')
+FLAG_BITS = (('ZF', 1), ('SF', 2), ('OF', 4), ('CF', 8))
+MAX_CHANGED_REGS = 3
+STACK_WRITE_OPCODES = ('PUSH', 'CALL')
+MEMORY_SIZE = 1048576
+
+TraceRecord = namedtuple('TraceRecord', 'ip next_ip opcode flags registers mem_bits mem_address mem_value')
+
+
+class TraceWriter:
+    """
+    Grava registros de rastro em disco através de um arquivo bufferizado.
+    Normalmente criado pelo próprio Simulator: `sim.run(trace_path=path, headless=True)`.
+    """
+
+    def __init__(self, path, buffer_size=1 << 20):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'wb', buffering=buffer_size)
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def record(self, ip, next_ip, opcode, regs_before, regs_after, flags, mem_write=None):
+        """
+        Grava uma instrução. regs_before/regs_after são dicionários de
+        registradores 16-bit; mem_write é (endereço físico, valor, bits) ou None.
+        """
+        mask = 0
+        values = []
+        for i, reg in enumerate(REGISTERS):
+            if regs_before[reg] != regs_after[reg]:
+                if len(values) == MAX_CHANGED_REGS:
+                    raise ValueError(f"Mais de {MAX_CHANGED_REGS} registradores alterados em IP={ip:04X}")
+                mask |= 1 << i
+                values.append(regs_after[reg])
+        values += [0] * (MAX_CHANGED_REGS - len(values))
+
+        packed_flags = 0
+        for name, bit in FLAG_BITS:
+            if flags.get(name):
+                packed_flags |= bit
+
+        if mem_write is None:
+            mem_bits, mem_addr, mem_val = 0, 0, 0
+        else:
+            mem_addr, mem_val, mem_bits = mem_write
+
+        self._file.write(RECORD.pack(
+            ip & 0xFFFF, next_ip & 0xFFFF, OPCODE_IDS[opcode], packed_flags, mask,
+            values[0], values[1], values[2],
+            mem_bits, mem_addr, mem_val & 0xFFFF,
+        ))
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    """
+    Leitor com acesso aleatório (mmap) para arquivos gerados por TraceWriter.
+    Suporta len(), indexação, iteração, filtros e conversão para o log textual.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, record_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Arquivo '{path}' não é um rastro de execução")
+        if version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"Versão de rastro não suportada: {version} (registro de {record_size} bytes)")
+
+        self._count = (len(self._mm) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Índice de rastro fora do intervalo")
+        return self._decode(RECORD.unpack_from(self._mm, HEADER.size + index * RECORD.size))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def _decode(self, raw):
+        ip, next_ip, op_id, packed_flags, mask, v0, v1, v2, mem_bits, mem_addr, mem_val = raw
+        values = (v0, v1, v2)
+        registers = {}
+        slot = 0
+        for i, reg in enumerate(REGISTERS):
+            if mask & (1 << i):
+                registers[reg] = values[slot]
+                slot += 1
+        flags = {name: 1 if packed_flags & bit else 0 for name, bit in FLAG_BITS}
+        return TraceRecord(ip, next_ip, OPCODES[op_id], flags, registers, mem_bits, mem_addr, mem_val)
+
+    def filter(self, opcode=None, ip=None, mem_address=None, start=0, stop=None):
+        """
+        Gera (índice, registro) das entradas que satisfazem todos os critérios
+        informados. O teste de ip/opcode é feito sobre o registro cru, sem decodificar.
+        """
+        stop = self._count if stop is None else min(stop, self._count)
+        op_id = None if opcode is None else OPCODE_IDS[opcode.upper()]
+        for i in range(start, stop):
+            raw = RECORD.unpack_from(self._mm, HEADER.size + i * RECORD.size)
+            if ip is not None and raw[0] != ip:
+                continue
+            if op_id is not None and raw[2] != op_id:
+                continue
+            if mem_address is not None and (raw[8] == 0 or raw[9] != mem_address):
+                continue
+            yield i, self._decode(raw)
+
+    def to_text(self, program=None, cs=0, ds=0, start=0, stop=None):
+        """
+        Converte o rastro para o log textual de Simulator.run(), reproduzindo as
+        linhas "[IP=....] Executando: ..." e "[MEM] Escreveu ... em DS:[0x....] (Físico: [0x.....])".
+        Se `program` (Simulator.program) for informado, os operandos são recuperados dele.
+        `ds` é o valor de DS no registro `start`; as mudanças seguintes vêm do próprio rastro.
+
+        O rastro não guarda o resto do log, que fica de fora: o trace de hardware
+        ([MMU]/[BUS]/[CPU]) e as linhas de resultado de cada opcode
+        (ex: "CMP (16-bit): ...", "JMP para ...", "LOOP: CX=...").
+        """
+        lines = []
+        for _, rec in self.filter(start=start, stop=stop):
+            operands = []
+            if program is not None:
+                entry = program.get((cs << 4) + rec.ip)
+                if entry is not None:
+                    operands = entry[1]
+            lines.append(f"[IP={rec.ip:04X}] Executando: {rec.opcode} {', '.join(operands)}")
+            # Escritas na pilha (PUSH/CALL) não geram linha [MEM] no log original
+            if rec.mem_bits and rec.opcode not in STACK_WRITE_OPCODES:
+                offset = (rec.mem_address - (ds << 4)) % MEMORY_SIZE & 0xFFFF
+                physical = (ds << 4) + offset
+                lines.append(f"   [MEM] Escreveu [0x{rec.mem_value:04X}] ou {rec.mem_value} "
+                             f"em DS:[0x{offset:04X}] (Físico: [0x{physical:05X}])")
+            ds = rec.registers.get('ds', ds)
+        return '\n'.join(lines)
+
+    def close(self):
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
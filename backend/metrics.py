@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas no formato de exposição texto do Prometheus, só com a biblioteca padrão.
+
+Cada métrica tem seu próprio lock, mantido apenas durante a atualização de
+um número; a renderização copia os valores e formata fora do lock.
+"""
+import threading
+import weakref
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Métrica '{self.name}' espera os rótulos {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, key, (), value) for key, value in items]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Contador só pode aumentar")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class FunctionGauge(_Metric):
+    """Gauge calculado na hora da coleta (ex: instâncias vivas)"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, func):
+        super().__init__(name, documentation)
+        self._func = func
+
+    def _samples(self):
+        return [(self.name, (), (), self._func())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # contagens por balde (+ balde +Inf), soma, total
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                samples.append((f"{self.name}_bucket", key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# --- Métricas do serviço ---
+REGISTRY = Registry()
+
+# Simuladores vivos (referências fracas: somem quando o objeto é coletado)
+live_simulators = weakref.WeakSet()
+
+
+def track_simulator(sim):
+    live_simulators.add(sim)
+    return sim
+
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'simulator_request_duration_seconds', 'Latência das requisições por rota.', ('route', 'status')))
+INSTRUCTIONS_EXECUTED = REGISTRY.register(Counter(
+    'simulator_instructions_executed_total', 'Instruções executadas por /run e /step.'))
+LOAD_FAILURES = REGISTRY.register(Counter(
+    'simulator_load_failures_total', 'Falhas ao carregar/montar programas.', ('reason',)))
+RUN_DURATION = REGISTRY.register(Gauge(
+    'simulator_last_run_duration_seconds', 'Duração da última execução por rota.', ('route',)))
+LOG_SIZE = REGISTRY.register(Gauge(
+    'simulator_last_log_bytes', 'Tamanho do log textual da última resposta por rota.', ('route',)))
+REGISTRY.register(FunctionGauge(
+    'simulator_instances', 'Instâncias de Simulator vivas.', lambda: len(live_simulators)))
+REGISTRY.register(FunctionGauge(
+    'simulator_memory_bytes', 'Memória efetivamente alocada pelas instâncias de Simulator vivas.',
+    lambda: sum(sim.memory_bytes() for sim in list(live_simulators))))
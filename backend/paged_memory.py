@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Memória esparsa paginada para o Simulator.
+
+A memória de 1 MB é dividida em páginas de 4 KiB alocadas só na primeira
+escrita de um valor diferente de zero. Leituras de páginas nunca escritas
+vêm de uma página de zeros compartilhada, então uma sessão que só toca
+DS, SS:SP e CS ocupa alguns KB em vez de 1 MB.
+
+Implementa o subconjunto da interface de bytearray usado pelo simulador:
+len(), leitura/escrita por índice e por fatia contígua.
+
+Como uma página só é alocada ao ser escrita, as páginas alocadas são
+exatamente as sujas desde o último clear(): o reset zera só essas e as
+guarda numa lista livre para reaproveitar sem nova alocação.
+"""
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+
+# Página de zeros compartilhada por todas as instâncias (somente leitura)
+ZERO_PAGE = bytes(PAGE_SIZE)
+
+
+class PagedMemory:
+
+    def __init__(self, size):
+        self._size = size
+        self._pages = [None] * ((size + PAGE_SIZE - 1) >> PAGE_SHIFT)
+        self._dirty = []  # números das páginas alocadas (= escritas) desde o último clear()
+        self._free = []  # páginas já zeradas prontas para reuso
+
+    def __len__(self):
+        return self._size
+
+    def _index(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Endereço de memória fora do intervalo")
+        return index
+
+    def _range(self, key):
+        start, stop, step = key.indices(self._size)
+        if step != 1:
+            raise ValueError("PagedMemory só suporta fatias contíguas")
+        return start, max(start, stop)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop = self._range(key)
+            out = bytearray()
+            while start < stop:
+                page = self._pages[start >> PAGE_SHIFT] or ZERO_PAGE
+                offset = start & PAGE_MASK
+                n = min(PAGE_SIZE - offset, stop - start)
+                out += page[offset:offset + n]
+                start += n
+            return out
+
+        index = self._index(key)
+        page = self._pages[index >> PAGE_SHIFT]
+        return page[index & PAGE_MASK] if page is not None else 0
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop = self._range(key)
+            data = memoryview(bytes(value))
+            if len(data) != stop - start:
+                raise ValueError("PagedMemory não suporta mudar o tamanho da memória")
+            pos = 0
+            while start < stop:
+                n = min(PAGE_SIZE - (start & PAGE_MASK), stop - start)
+                chunk = data[pos:pos + n]
+                page = self._pages[start >> PAGE_SHIFT]
+                if page is None and any(chunk):
+                    page = self._alloc(start >> PAGE_SHIFT)
+                if page is not None:
+                    offset = start & PAGE_MASK
+                    page[offset:offset + n] = chunk
+                start += n
+                pos += n
+            return
+
+        index = self._index(key)
+        page = self._pages[index >> PAGE_SHIFT]
+        if page is None:
+            if value == 0:
+                return  # zero em página não alocada: nada muda
+            page = self._alloc(index >> PAGE_SHIFT)
+        page[index & PAGE_MASK] = value
+
+    def _alloc(self, page_no):
+        page = self._free.pop() if self._free else bytearray(PAGE_SIZE)
+        self._pages[page_no] = page
+        self._dirty.append(page_no)
+        return page
+
+    def clear(self):
+        """Zera a memória tocando só as páginas escritas desde o último clear()"""
+        pages = self._pages
+        for page_no in self._dirty:
+            page = pages[page_no]
+            page[:] = ZERO_PAGE
+            self._free.append(page)
+            pages[page_no] = None
+        self._dirty = []
+
+    def allocated_pages(self):
+        return len(self._dirty)
+
+    def allocated_bytes(self):
+        """Bytes efetivamente alocados (páginas em uso e livres + tabela de páginas)"""
+        return (len(self._dirty) + len(self._free)) * PAGE_SIZE + len(self._pages) * 8
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de instâncias de Simulator pré-inicializadas.
+
+Em vez de construir um Simulator novo a cada sessão/correção, as instâncias
+devolvidas passam por Simulator.reset() (que zera só as páginas de memória
+sujas) e ficam aquecidas para o próximo acquire().
+"""
+import threading
+
+from Simulador import Simulator
+
+
+class SimulatorPool:
+
+    def __init__(self, size=4, max_size=None, factory=Simulator):
+        self.factory = factory
+        self.max_size = max(size, max_size or size)
+        self._lock = threading.Lock()
+        self._idle = [factory() for _ in range(size)]
+
+    def acquire(self):
+        """Retorna uma instância equivalente a um Simulator recém-criado"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.factory()
+
+    def release(self, sim):
+        """Devolve a instância ao pool: desliga instrumentos opcionais e reinicia"""
+        sim.bus = None
+        sim.cache = None
+        sim.timing = None
+        sim.reset()
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(sim)
+
+    def __len__(self):
+        return len(self._idle)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from Simulador import Simulator
+from devices import build_bus
+
+
+def test_laco_lendo_entrada_nao_e_sem_progresso():
+    # Cada volta consome um valor da fila: o estado do dispositivo muda
+    # mesmo com registradores, flags e memória repetidos
+    sim = Simulator()
+    sim.bus = build_bus([
+        {"type": "console", "port": 1},
+        {"type": "input", "port": 0x60, "script": [[0, 65], [0, 65], [0, 65], [0, 66]]},
+    ])
+    sim.load_program_from_text(
+        "l:\n"
+        "IN AL, 60h\n"
+        "CMP AL, 66\n"
+        "JE fim\n"
+        "OUT 1, AL\n"
+        "JMP l\n"
+        "fim:\n"
+    )
+    sim.run()
+
+    assert sim.stop_reason == 'END'
+    assert sim.cpu.get_reg('al') == 66
+    assert sim.bus.devices[0].output == ['A', 'A', 'A']
+
+
+def test_laco_com_fila_vazia_e_sem_progresso():
+    sim = Simulator()
+    sim.bus = build_bus([{"type": "input", "port": 0x60, "script": [[0, 65]]}])
+    sim.load_program_from_text(
+        "l:\n"
+        "IN AL, 60h\n"
+        "CMP AL, 66\n"
+        "JE fim\n"
+        "JMP l\n"
+        "fim:\n"
+    )
+    sim.run()
+
+    assert sim.stop_reason == 'NO_PROGRESS'
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo de temporização do 8086: cobra de cada instrução executada os ciclos
+de clock documentados no manual da Intel (iAPX 86/88 User's Manual).
+
+Simplificações:
+ - MUL/DIV usam o menor valor da faixa documentada (o custo real depende dos dados)
+ - não há acréscimo de +4 ciclos por acesso a palavra em endereço ímpar
+ - não há override de segmento (+2), pois o simulador não o suporta
+"""
+from bisect import bisect_right
+
+REGS_16 = ('ax', 'bx', 'cx', 'dx', 'si', 'di', 'bp', 'sp')
+REGS_8 = ('al', 'ah', 'bl', 'bh', 'cl', 'ch', 'dl', 'dh')
+SEG_REGS = ('cs', 'ds', 'ss', 'es')
+
+# Custo do cálculo de endereço efetivo (EA) por combinação base/índice
+EA_BASE_INDEX = {
+    frozenset(('bp', 'di')): 7, frozenset(('bx', 'si')): 7,
+    frozenset(('bp', 'si')): 8, frozenset(('bx', 'di')): 8,
+}
+
+# (destino, fonte) -> ciclos; 'mem' soma o EA do operando de memória
+TWO_OPERAND = {
+    'MOV': {('reg', 'reg'): 2, ('reg', 'mem'): 8, ('mem', 'reg'): 9,
+            ('reg', 'imm'): 4, ('mem', 'imm'): 10},
+    'ALU': {('reg', 'reg'): 3, ('reg', 'mem'): 9, ('mem', 'reg'): 16,
+            ('reg', 'imm'): 4, ('mem', 'imm'): 17},
+    'CMP': {('reg', 'reg'): 3, ('reg', 'mem'): 9, ('mem', 'reg'): 9,
+            ('reg', 'imm'): 4, ('mem', 'imm'): 10},
+    'XCHG': {('reg', 'reg'): 4, ('reg', 'mem'): 17, ('mem', 'reg'): 17},
+}
+ALU_OPCODES = ('ADD', 'SUB', 'AND', 'OR', 'XOR')
+
+# Pulos: (tomado, não tomado)
+BRANCHES = {
+    'JE': (16, 4), 'JNE': (16, 4), 'JG': (16, 4), 'JGE': (16, 4),
+    'JL': (16, 4), 'JLE': (16, 4), 'LOOP': (17, 5),
+}
+
+NO_LABEL = '(sem rótulo)'
+
+
+def operand_kind(operand):
+    """Classifica um operando como 'reg', 'mem' ou 'imm' (rótulos contam como imediato)"""
+    op = operand.strip().lower()
+    if op.startswith('['):
+        return 'mem'
+    if op in REGS_16 or op in REGS_8 or op in SEG_REGS:
+        return 'reg'
+    return 'imm'
+
+
+def ea_cycles(expr):
+    """
+    Ciclos do cálculo de endereço efetivo para as formas de _decode_memory_address:
+    [disp] 6, [reg] 5, [reg+disp] 9, [base+índice] 7/8, [base+índice+disp] 11/12.
+    """
+    inner = expr.strip().lower()[1:-1].replace(' ', '').replace('-', '+')
+    regs = []
+    has_disp = False
+    for part in inner.split('+'):
+        if part == '':
+            continue
+        if part in ('bx', 'bp', 'si', 'di'):
+            regs.append(part)
+        else:
+            has_disp = True
+
+    if not regs:
+        return 6
+    if len(regs) == 1:
+        return 9 if has_disp else 5
+    cost = EA_BASE_INDEX.get(frozenset(regs), 8)
+    return cost + 4 if has_disp else cost
+
+
+def _is_8bit(operands):
+    return any(op.strip().lower() in REGS_8 for op in operands)
+
+
+def static_cycles(opcode, operands):
+    """
+    Custo de uma instrução que não depende da execução. Para pulos condicionais
+    e LOOP retorna o par (tomado, não tomado).
+    """
+    if opcode in BRANCHES:
+        return BRANCHES[opcode]
+
+    kinds = [operand_kind(op) for op in operands]
+    ea = sum(ea_cycles(op) for op, k in zip(operands, kinds) if k == 'mem')
+
+    if opcode in ('MOV', 'CMP', 'XCHG') or opcode in ALU_OPCODES:
+        table = TWO_OPERAND['ALU' if opcode in ALU_OPCODES else opcode]
+        key = tuple(kinds[:2])
+        if key == ('mem', 'mem'):
+            # Não existe no 8086, mas o simulador aceita: cobra como mem,reg
+            key = ('mem', 'reg')
+        if opcode == 'XCHG' and key == ('reg', 'reg') and 'ax' in (op.strip().lower() for op in operands):
+            return 3
+        return table.get(key, 4) + ea
+
+    kind = kinds[0] if kinds else 'reg'
+    is_mem = kind == 'mem'
+    byte = _is_8bit(operands)
+
+    if opcode in ('INC', 'DEC'):
+        return 15 + ea if is_mem else (3 if byte else 2)
+    if opcode in ('NEG', 'NOT'):
+        return 16 + ea if is_mem else 3
+    if opcode == 'MUL':
+        if is_mem:
+            return 124 + ea
+        return 70 if byte else 118
+    if opcode == 'DIV':
+        if is_mem:
+            return 150 + ea
+        return 80 if byte else 144
+    if opcode == 'PUSH':
+        if is_mem:
+            return 16 + ea
+        return 10 if operands[0].strip().lower() in SEG_REGS else 11
+    if opcode == 'POP':
+        return 17 + ea if is_mem else 8
+    if opcode == 'JMP':
+        return {'mem': 18 + ea, 'reg': 11}.get(kind, 15)
+    if opcode == 'CALL':
+        return {'mem': 21 + ea, 'reg': 16}.get(kind, 19)
+    if opcode == 'RET':
+        return 8
+    if opcode == 'IRET':
+        return 24
+    if opcode == 'IN':
+        return 8 if operands[1].strip().lower() == 'dx' else 10
+    if opcode == 'OUT':
+        return 8 if operands[0].strip().lower() == 'dx' else 10
+
+    raise ValueError(f"Sem tabela de ciclos para '{opcode}'")
+
+
+class TimingModel:
+    """
+    Acumula ciclos por execução e por instrução (endereço de IP).
+    O custo estático é calculado uma única vez por endereço.
+    """
+
+    def __init__(self):
+        self.total_cycles = 0
+        self.instructions = 0
+        self._static = {}  # ip -> custo estático (ou par tomado/não tomado)
+        self._per_ip = {}  # ip -> [opcode, operandos, execuções, ciclos]
+
+    def charge(self, ip, opcode, operands, taken=False):
+        """Cobra uma instrução executada no offset `ip`; `taken` vale para pulos condicionais"""
+        cost = self._static.get(ip)
+        if cost is None:
+            cost = self._static[ip] = static_cycles(opcode, operands)
+        if isinstance(cost, tuple):
+            cost = cost[0] if taken else cost[1]
+
+        entry = self._per_ip.get(ip)
+        if entry is None:
+            entry = self._per_ip[ip] = [opcode, operands, 0, 0]
+        entry[2] += 1
+        entry[3] += cost
+
+        self.total_cycles += cost
+        self.instructions += 1
+        return cost
+
+    def report(self, labels=None):
+        """Resumo para a API: total, por rótulo (rótulo anterior mais próximo) e por instrução"""
+        ordered = sorted((offset, name) for name, offset in (labels or {}).items())
+        offsets = [offset for offset, _ in ordered]
+
+        per_label = {}
+        per_instruction = []
+        for ip in sorted(self._per_ip):
+            opcode, operands, count, cycles = self._per_ip[ip]
+            i = bisect_right(offsets, ip)
+            label = ordered[i - 1][1] if i else NO_LABEL
+            per_label[label] = per_label.get(label, 0) + cycles
+            per_instruction.append({
+                "ip": ip,
+                "instruction": f"{opcode} {', '.join(operands)}".strip(),
+                "count": count,
+                "cycles": cycles,
+            })
+
+        return {
+            "total_cycles": self.total_cycles,
+            "instructions": self.instructions,
+            "per_label": per_label,
+            "per_instruction": per_instruction,
+        }